@@ -1,4 +1,6 @@
+import functools
 import os
+import threading
 from supabase import create_client, Client
 from dotenv import load_dotenv
 import json
@@ -13,6 +15,25 @@ logger = logging.getLogger(__name__)
 load_dotenv()
 
 class SupabaseDB:
+    # One raw client per process, shared across every SupabaseDB built with
+    # the same credentials (hot-reload, background threads, direct
+    # instantiation). create_client pays TLS + auth setup, so it must not
+    # run once per wrapper; the lock makes first creation thread-safe.
+    _shared_client = None
+    _shared_client_key = None
+    _client_lock = threading.Lock()
+
+    @classmethod
+    @functools.lru_cache(maxsize=1)
+    def instance(cls):
+        """Process-wide shared instance.
+
+        create_client sets up TLS and httpx internals, so every module
+        (orchestrator, Streamlit, scripts) should reuse one client instead
+        of paying that cost per instantiation.
+        """
+        return cls()
+
     def __init__(self):
         # Dynamic check to support Streamlit Secrets and late-loaded env vars
         self.url = os.getenv("SUPABASE_URL")
@@ -35,11 +56,24 @@ class SupabaseDB:
             raise ValueError("⚠️ Estás usando una 'Management Key' (sbp_...). Necesitas la 'Anon Key' o 'Service Role Key' de Project Settings -> API.")
 
         try:
-            self.client: Client = create_client(self.url, self.key)
+            self.client: Client = self._get_shared_client(self.url, self.key)
         except Exception as e:
             logger.error(f"Error initializing Supabase client: {e}")
             raise ConnectionError(f"No se pudo inicializar el cliente de Supabase: {e}")
 
+    @classmethod
+    def _get_shared_client(cls, url: str, key: str) -> Client:
+        """Returns the process-wide client, creating it under a lock.
+
+        supabase-py v2 is httpx-based and pools connections internally, so
+        reusing one client is what keeps TCP/TLS handshakes off every call.
+        """
+        with cls._client_lock:
+            if cls._shared_client is None or cls._shared_client_key != (url, key):
+                cls._shared_client = create_client(url, key)
+                cls._shared_client_key = (url, key)
+            return cls._shared_client
+
     def _handle_response(self, func, *args, **kwargs):
         """Helper to handle database responses and errors."""
         try:
@@ -81,6 +115,20 @@ class SupabaseDB:
             return self.client.schema("leadscoring").table("lead_scores").insert(data).execute()
         self._handle_response(call)
 
+    def insert_leads_bulk(self, raw_data_list: list, tenant_id: str = "default"):
+        """Inserts multiple leads in one request, returns their IDs in insertion order."""
+        data = [{"raw_data": raw_data, "tenant_id": tenant_id} for raw_data in raw_data_list]
+        def call():
+            return self.client.schema("leadscoring").table("leads").insert(data).execute()
+        response = self._handle_response(call)
+        return [row['id'] for row in response.data]
+
+    def insert_scores_bulk(self, rows: list):
+        """Inserts multiple score rows in a single request (PostgREST accepts JSON arrays)."""
+        def call():
+            return self.client.schema("leadscoring").table("lead_scores").insert(rows).execute()
+        self._handle_response(call)
+
     def get_lead_history(self, lead_id: str):
         """Retrieves scoring history for a lead."""
         def call():
@@ -104,13 +152,28 @@ class SupabaseDB:
             return self.client.schema("leadscoring").table("model_versions").insert(data).execute()
         return self._handle_response(call)
 
+    def get_score_histogram(self, bins: int = 20):
+        """Score distribution aggregated server-side (see lead_score_hist in SQL).
+
+        Returns [{'bucket': .., 'count': ..}] — O(bins) rows regardless of
+        how many leads have been scored.
+        """
+        def call():
+            return self.client.schema("leadscoring").rpc("lead_score_hist", {"bins": bins}).execute()
+        response = self._handle_response(call)
+        return response.data
+
     def get_unscored_leads(self):
-        """Fetches leads from the 'leads' table that don't have an entry in 'lead_scores' yet."""
+        """Fetches leads from the 'leads' table that don't have an entry in 'lead_scores' yet.
+
+        The filter runs server-side via the get_unscored_leads() Postgres
+        function (see schema_isolated.sql), so only unscored rows are
+        transferred instead of every lead plus an embedded join.
+        """
         def call():
-            return self.client.schema("leadscoring").table("leads").select("*, lead_scores(id)").execute()
+            return self.client.schema("leadscoring").rpc("get_unscored_leads").execute()
         response = self._handle_response(call)
-        unscored = [item for item in response.data if not item.get('lead_scores')]
-        return unscored
+        return response.data
 
 if __name__ == "__main__":
     try:
@@ -1,5 +1,7 @@
+import numpy as np
 import pandas as pd
 import logging
+from concurrent.futures import ThreadPoolExecutor
 from db_supabase import SupabaseDB
 from predict import LeadScorer
 import json
@@ -11,12 +13,15 @@ logger = logging.getLogger(__name__)
 
 class LeadOrchestrator:
     def __init__(self, action_threshold=70):
-        self.scorer = LeadScorer()
+        self.scorer = LeadScorer.from_path()
         self.db = None
         self.action_threshold = action_threshold
+        # Supabase calls are I/O-bound; the executor lets inserts overlap
+        # with prediction of the next chunk
+        self._io_executor = ThreadPoolExecutor(max_workers=16)
         
         try:
-            self.db = SupabaseDB()
+            self.db = SupabaseDB.instance()
             logger.info("Orchestrator: Supabase connection initialized.")
         except Exception as e:
             logger.warning(f"Orchestrator: Supabase connection failed ({e}). Running in local-only mode.")
@@ -67,24 +72,147 @@ class LeadOrchestrator:
         
         return result
 
-    def process_batch(self, file_path: str):
-        """Processes a CSV file as a batch of leads."""
+    def process_batch(self, file_path: str, chunksize: int = 50_000):
+        """Processes a CSV file as a batch of leads, streaming it in chunks.
+
+        Reading in chunks keeps peak memory bounded by chunksize instead of
+        file size; explicit dtypes from the model metadata speed up parsing.
+        """
         logger.info(f"Starting batch process for {file_path}")
-        df = pd.read_csv(file_path)
-        
+
         results = []
-        for index, row in df.iterrows():
-            # Convert row to dict, excluding target if present
-            lead_dict = row.to_dict()
-            if 'converted' in lead_dict: del lead_dict['converted']
-            if 'lead_id' in lead_dict: del lead_dict['lead_id']
-            
-            res = self.process_new_lead(lead_dict)
-            results.append(res)
-            
+        pending = []
+        for chunk in self._iter_csv_chunks(file_path, chunksize):
+            chunk_results, future = self._process_chunk(chunk)
+            results.extend(chunk_results)
+            pending.append((chunk_results, future))
+
+        # Drain the in-flight inserts before reporting completion
+        for chunk_results, future in pending:
+            self._finish_chunk(chunk_results, future)
+
         logger.info(f"Batch processing complete. Processed {len(results)} leads.")
         return results
 
+    def process_dataframe(self, df: pd.DataFrame):
+        """Processes an already-loaded DataFrame of leads.
+
+        Lets callers that hold the data in memory (e.g. the Streamlit
+        uploader) skip the serialize-to-disk/re-parse round-trip.
+        """
+        logger.info(f"Starting batch process for in-memory DataFrame ({len(df)} rows)")
+        results = self._finish_chunk(*self._process_chunk(df))
+        logger.info(f"Batch processing complete. Processed {len(results)} leads.")
+        return results
+
+    def process_parquet(self, file_path: str):
+        """Processes a Parquet file of leads.
+
+        Parquet is columnar, so only the model's feature columns are read
+        from disk — unused columns are never parsed, unlike CSV.
+        """
+        logger.info(f"Starting batch process for {file_path}")
+        df = pd.read_parquet(file_path, columns=self.scorer._all_cols)
+        results = self._finish_chunk(*self._process_chunk(df))
+        logger.info(f"Batch processing complete. Processed {len(results)} leads.")
+        return results
+
+    def _finish_chunk(self, results: list, future):
+        """Waits for a chunk's persistence future and fires its actions."""
+        if future is None:
+            lead_ids = [None] * len(results)
+        else:
+            try:
+                lead_ids = future.result()
+            except Exception as e:
+                logger.error(f"Failed to persist batch: {e}")
+                lead_ids = [None] * len(results)
+        self._run_actions(lead_ids, results)
+        return results
+
+    def _csv_dtypes(self):
+        """Explicit CSV dtypes derived from the model metadata."""
+        metadata = self.scorer.metadata
+        if not metadata:
+            return None
+        # Schema captured at training time covers non-feature columns too
+        dtypes = dict(metadata.get('csv_dtypes', {}))
+        dtypes.update({col: 'float32' for col in metadata['num_cols']})
+        dtypes.update({col: 'category' for col in metadata['cat_cols']})
+        return dtypes
+
+    def _iter_csv_chunks(self, file_path: str, chunksize: int):
+        """Yields DataFrame chunks, preferring pyarrow's multi-threaded reader."""
+        dtypes = self._csv_dtypes()
+        try:
+            import pyarrow as pa
+            import pyarrow.csv as pac
+        except ImportError:
+            yield from pd.read_csv(file_path, chunksize=chunksize, dtype=dtypes)
+            return
+
+        arrow_types = {}
+        for col, dtype in (dtypes or {}).items():
+            if str(dtype) == 'category':
+                arrow_types[col] = pa.dictionary(pa.int32(), pa.string())
+            else:
+                try:
+                    arrow_types[col] = pa.from_numpy_dtype(np.dtype(dtype))
+                except (TypeError, pa.ArrowNotImplementedError):
+                    pass  # leave type inference to pyarrow (e.g. object dtype)
+
+        # strings_can_be_null matches pandas: empty fields become null (later
+        # imputed to 'missing'), not a spurious '' category
+        with pac.open_csv(
+            file_path,
+            convert_options=pac.ConvertOptions(column_types=arrow_types,
+                                               strings_can_be_null=True),
+            read_options=pac.ReadOptions(block_size=8 << 20)
+        ) as reader:
+            for batch in reader:
+                yield batch.to_pandas()
+
+    def _process_chunk(self, df: pd.DataFrame):
+        """Scores one DataFrame of leads and schedules persistence on the executor.
+
+        Returns (results, future) where future resolves to the inserted lead
+        IDs, or None when no DB is connected.
+        """
+        # Exclude target/id columns once for the whole batch
+        df = df.drop(columns=['converted', 'lead_id'], errors='ignore')
+
+        # Single vectorized pipeline call instead of one predict per row
+        results = self.scorer.predict_batch(df)
+        if results is None:
+            logger.error("Batch prediction failed.")
+            return [], None
+
+        future = None
+        if self.db:
+            future = self._io_executor.submit(
+                self._persist_chunk, df.to_dict(orient='records'), results
+            )
+        return results, future
+
+    def _persist_chunk(self, lead_dicts: list, results: list):
+        """Persists one scored chunk in two bulk requests, returns lead IDs."""
+        lead_ids = self.db.insert_leads_bulk(lead_dicts)
+        score_rows = [{
+            "lead_id": lead_id,
+            "score": result['score'],
+            "probability": result['probability'],
+            "explanation": result['explanation'],
+            "model_version_id": None
+        } for lead_id, result in zip(lead_ids, results)]
+        self.db.insert_scores_bulk(score_rows)
+        return lead_ids
+
+    def _run_actions(self, lead_ids: list, results: list):
+        """Fires the high-intent action for every result above the threshold."""
+        for lead_id, result in zip(lead_ids, results):
+            if result['score'] >= self.action_threshold:
+                self._trigger_high_intent_action(lead_id, result['score'], result['explanation'])
+
     def sync_unscored_leads(self):
         """Fetches leads from Supabase that don't have scores and processes them."""
         logger.info("Syncing unscored leads from Supabase...")
@@ -95,30 +223,36 @@ class LeadOrchestrator:
         unscored = self.db.get_unscored_leads()
         logger.info(f"Found {len(unscored)} unscored leads.")
         
-        count = 0
+        score_rows = []
+        actions = []
         for lead in unscored:
             # The 'raw_data' contains the features
             lead_data = lead['raw_data']
             lead_id = lead['id']
-            
+
             # Predict
             result = self.scorer.predict(lead_data)
             if result:
-                self.db.insert_score(
-                    lead_id=lead_id,
-                    score=result['score'],
-                    probability=result['probability'],
-                    explanation=result['explanation']
-                )
-                
+                score_rows.append({
+                    "lead_id": lead_id,
+                    "score": result['score'],
+                    "probability": result['probability'],
+                    "explanation": result['explanation'],
+                    "model_version_id": None
+                })
+
                 # Check for action
                 if result['score'] >= self.action_threshold:
-                    self._trigger_high_intent_action(lead_id, result['score'], result['explanation'])
-                
-                count += 1
-        
-        logger.info(f"Sync complete. Processed {count} leads.")
-        return count
+                    actions.append((lead_id, result['score'], result['explanation']))
+
+        # One bulk insert instead of one round-trip per lead
+        if score_rows:
+            self.db.insert_scores_bulk(score_rows)
+        for lead_id, score, explanation in actions:
+            self._trigger_high_intent_action(lead_id, score, explanation)
+
+        logger.info(f"Sync complete. Processed {len(score_rows)} leads.")
+        return len(score_rows)
 
     def _trigger_high_intent_action(self, lead_id, score, explanation):
         """Simulates an action like sending an email or Slack alert."""
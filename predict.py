@@ -1,74 +1,342 @@
+import functools
+import json
+import os
 import joblib
 import pandas as pd
 import numpy as np
 
+# Numba is optional: when present, single-lead scoring runs as one JITed
+# kernel; otherwise the plain numpy fast path below is used.
+try:
+    from numba import njit
+except ImportError:
+    njit = None
+
+if njit is not None:
+    # fastmath minus 'nnan'/'ninf': full fastmath licenses LLVM to fold the
+    # v != v NaN check to False, which would break median imputation and let
+    # NaN reach the logit
+    @njit(cache=True, fastmath={'nsz', 'arcp', 'contract', 'afn', 'reassoc'})
+    def _score_kernel(num_vals, cat_idx, w, b, medians, means, scales):
+        """sigmoid(x @ w + b) without materializing the one-hot row."""
+        z = b
+        for i in range(num_vals.shape[0]):
+            v = num_vals[i]
+            if v != v:  # NaN -> median
+                v = medians[i]
+            z += w[i] * (v - means[i]) / scales[i]
+        for j in range(cat_idx.shape[0]):
+            if cat_idx[j] >= 0:  # unknown categories contribute nothing
+                z += w[cat_idx[j]]
+        return 1.0 / (1.0 + np.exp(-z))
+else:
+    _score_kernel = None
+
 class LeadScorer:
-    def __init__(self, model_path='lead_scoring_model.pkl', metadata_path='model_metadata.pkl'):
+    @classmethod
+    @functools.lru_cache(maxsize=2)
+    def from_path(cls, model_path='lead_scoring_model.pkl', metadata_path='model_metadata.json'):
+        """Process-wide memoized scorer for the given artifact paths.
+
+        Guarantees at most one unpickle per artifact per process even if an
+        external cache (e.g. Streamlit's) is evicted and rebuilt.
+        """
+        return cls(model_path, metadata_path)
+
+    def __init__(self, model_path='lead_scoring_model.pkl', metadata_path='model_metadata.json'):
         try:
-            self.pipeline = joblib.load(model_path)
-            self.metadata = joblib.load(metadata_path)
+            self.pipeline = self._load_model(model_path)
+            self.metadata = self._load_metadata(metadata_path)
             self.model = self.pipeline.named_steps['classifier']
             self.preprocessor = self.pipeline.named_steps['preprocessor']
+            self._quantize_model()
+            # Hoisted out of the per-prediction hot path
+            self._feature_names = self._get_feature_names()
+            self._all_cols = list(self.metadata['num_cols']) + list(self.metadata['cat_cols'])
+            self._all_cols_idx = pd.Index(self._all_cols)
+            self._build_fast_transform()
         except Exception as e:
             print(f"Error loading model: {e}")
             self.pipeline = None
 
+        # Per-instance LRU so identical leads (common with default/anonymous
+        # data) skip the pipeline entirely on repeat calls
+        self._predict_cached = functools.lru_cache(maxsize=4096)(self._predict_frozen)
+
+    @staticmethod
+    def _load_model(path):
+        """Loads the pipeline, memory-mapping when the artifact allows it.
+
+        mmap_mode shares the pickled numpy arrays (coefficients, OHE
+        categories, imputer statistics) read-only across processes, but
+        joblib can only mmap plain pickles — for a compressed legacy dump
+        the flag would just trigger a warning, so it is only passed when
+        the file starts with the pickle protocol marker.
+        """
+        with open(path, 'rb') as f:
+            is_plain_pickle = f.read(1) == b'\x80'
+        return joblib.load(path, mmap_mode='r' if is_plain_pickle else None)
+
+    @staticmethod
+    def _load_metadata(path):
+        """Loads model metadata, preferring JSON over legacy pickle.
+
+        The metadata is a small plain dict, so JSON parsing beats unpickling;
+        model_metadata.pkl from older training runs still loads.
+        """
+        if path.endswith('.json') and not os.path.exists(path):
+            legacy = path[:-len('.json')] + '.pkl'
+            if os.path.exists(legacy):
+                return joblib.load(legacy)
+        if path.endswith('.json'):
+            with open(path) as f:
+                return json.load(f)
+        return joblib.load(path)
+
+    def _quantize_model(self):
+        """Casts model weights to float32, halving bandwidth on the dot products."""
+        self.model.coef_ = self.model.coef_.astype(np.float32)
+        self.model.intercept_ = self.model.intercept_.astype(np.float32)
+        self._coefs_f32 = self.model.coef_[0]
+
+    def _build_fast_transform(self):
+        """Extracts fitted preprocessing parameters into plain numpy arrays.
+
+        The column set is fixed per deployed model, so imputation, scaling
+        and one-hot encoding can be fused into one pass over a preallocated
+        float32 buffer instead of dispatching through the sklearn
+        ColumnTransformer for every single-lead prediction. The sklearn path
+        is kept for training and as a fallback.
+        """
+        self._fast_path = False
+        try:
+            num_pipe = self.preprocessor.named_transformers_['num']
+            self._num_medians = num_pipe.named_steps['imputer'].statistics_.astype(np.float32)
+            self._num_means = num_pipe.named_steps['scaler'].mean_.astype(np.float32)
+            self._num_scales = num_pipe.named_steps['scaler'].scale_.astype(np.float32)
+
+            onehot = self.preprocessor.named_transformers_['cat'].named_steps['onehot']
+            offset = len(self.metadata['num_cols'])
+            self._cat_lookups = []
+            for categories in onehot.categories_:
+                self._cat_lookups.append({cat: offset + i for i, cat in enumerate(categories)})
+                offset += len(categories)
+            self._n_features_out = offset
+            self._n_num = len(self.metadata['num_cols'])
+            self._intercept = float(self.model.intercept_[0])
+            self._fast_path = True
+        except (KeyError, AttributeError):
+            pass
+
+    def _split_lead(self, lead_data: dict):
+        """Splits a lead dict into raw numeric values and one-hot column indices.
+
+        Unknown or unmapped categories get index -1 (no contribution), which
+        mirrors OneHotEncoder(handle_unknown='ignore'); absent/NaN categories
+        map to the 'missing' category like the fitted SimpleImputer.
+        """
+        num_vals = np.empty(self._n_num, dtype=np.float32)
+        for i, col in enumerate(self.metadata['num_cols']):
+            try:
+                num_vals[i] = float(lead_data.get(col))
+            except (TypeError, ValueError):
+                num_vals[i] = np.nan
+
+        cat_idx = np.empty(len(self._cat_lookups), dtype=np.int64)
+        for j, col in enumerate(self.metadata['cat_cols']):
+            value = lead_data.get(col, float('nan'))
+            if isinstance(value, float) and value != value:
+                value = 'missing'  # SimpleImputer(strategy='constant')
+            idx = self._cat_lookups[j].get(value)
+            cat_idx[j] = -1 if idx is None else idx
+
+        return num_vals, cat_idx
+
     def predict(self, lead_data: dict):
         """
         Receives a dictionary of lead data, returns score and explanation.
         """
         if self.pipeline is None:
             return None
-        
-        # Convert dict to DataFrame
-        df_lead = pd.DataFrame([lead_data])
-        
-        # Ensure correct column order/existence (fill missing with NaN)
-        all_cols = self.metadata['num_cols'] + self.metadata['cat_cols']
-        for col in all_cols:
-            if col not in df_lead.columns:
-                df_lead[col] = np.nan
-        
-        df_lead = df_lead[all_cols]
-        
-        # Probabilities
-        prob = self.pipeline.predict_proba(df_lead)[0][1]
-        score = round(prob * 100)
-        
-        # Explainability (for Logistic Regression)
-        explanation = self.get_explanation(df_lead)
-        
+
+        try:
+            frozen_items = tuple(sorted(lead_data.items()))
+            return self._predict_cached(frozen_items)
+        except TypeError:
+            # Unhashable values (lists/dicts) can't be cached
+            return self._predict_impl(lead_data)
+
+    def _predict_frozen(self, frozen_items: tuple):
+        """Cacheable entry point keyed on the frozen feature items."""
+        return self._predict_impl(dict(frozen_items))
+
+    def cache_info(self):
+        """Stats for the prediction LRU cache."""
+        return self._predict_cached.cache_info()
+
+    def cache_clear(self):
+        """Empties the prediction LRU cache (e.g. after loading a new model)."""
+        self._predict_cached.cache_clear()
+
+    def _predict_impl(self, lead_data: dict):
+        if self._fast_path:
+            # Split the lead into numeric values and one-hot column indices;
+            # the one-hot row itself is never materialized
+            num_vals, cat_idx = self._split_lead(lead_data)
+            num_scaled = (np.where(np.isnan(num_vals), self._num_medians, num_vals)
+                          - self._num_means) / self._num_scales
+            active_cats = cat_idx[cat_idx >= 0]
+            impacts = np.zeros(self._n_features_out, dtype=np.float32)
+            impacts[:self._n_num] = num_scaled * self._coefs_f32[:self._n_num]
+            impacts[active_cats] = self._coefs_f32[active_cats]
+
+            if _score_kernel is not None:
+                prob = float(_score_kernel(num_vals, cat_idx, self._coefs_f32,
+                                           self._intercept, self._num_medians,
+                                           self._num_means, self._num_scales))
+            else:
+                logit = float(impacts.sum()) + self._intercept
+                prob = 1.0 / (1.0 + np.exp(-logit))
+            explanation = self._top_factors(impacts)
+        else:
+            # Convert dict to DataFrame with the precomputed column order
+            # (missing columns become NaN, extras are dropped)
+            df_lead = pd.DataFrame([lead_data]).reindex(columns=self._all_cols_idx)
+            prob = self.pipeline.predict_proba(df_lead)[0][1]
+            explanation = self.get_explanation(df_lead)
+
         return {
-            "score": score,
+            "score": round(float(prob) * 100),
             "probability": round(float(prob), 4),
             "explanation": explanation
         }
 
+    def predict_batch(self, df: pd.DataFrame):
+        """
+        Scores a whole DataFrame of leads with a single pipeline call.
+        Returns a list of result dicts (same shape as predict()).
+        """
+        if self.pipeline is None:
+            return None
+        # sklearn transformers reject 0-sample input (e.g. a headers-only CSV)
+        if len(df) == 0:
+            return []
+
+        # Align columns once for the whole batch (missing ones become NaN)
+        df = df.reindex(columns=self._all_cols_idx)
+
+        # One predict_proba call over all rows instead of N single-row calls
+        probs = self.pipeline.predict_proba(df)[:, 1]
+
+        # Vectorized explanation: transform the whole batch and multiply by coefs
+        coefs = self._coefs_f32
+        transformed = self.preprocessor.transform(df)
+        is_sparse = hasattr(transformed, 'multiply')
+        if is_sparse:
+            # Keep CSR: only nonzero entries carry impact, no need to densify
+            impacts_sp = transformed.multiply(coefs).tocsr()
+        else:
+            impacts = transformed * coefs
+
+        results = []
+        for i in range(len(df)):
+            if is_sparse:
+                start, end = impacts_sp.indptr[i], impacts_sp.indptr[i + 1]
+                explanation = self._top_factors(impacts_sp.data[start:end],
+                                                impacts_sp.indices[start:end])
+            else:
+                explanation = self._top_factors(impacts[i])
+
+            results.append({
+                "score": round(float(probs[i]) * 100),
+                "probability": round(float(probs[i]), 4),
+                "explanation": explanation
+            })
+
+        return results
+
+    def predict_arrays(self, num_array, cat_array):
+        """
+        SoA fast path: scores pre-split columnar arrays without pandas.
+
+        num_array: (B, n_num) numeric values ordered like metadata['num_cols'].
+        cat_array: (B, n_cat) category values ordered like metadata['cat_cols'].
+        Returns the same list of result dicts as predict_batch.
+        """
+        if self.pipeline is None:
+            return None
+
+        num_array = np.asarray(num_array, dtype=np.float64).reshape(len(num_array), -1)
+        cat_array = np.asarray(cat_array, dtype=object).reshape(len(num_array), -1)
+
+        if self._fast_path:
+            # Vectorized impute + scale straight from the extracted parameters
+            num = np.where(np.isnan(num_array), self._num_medians, num_array)
+            num = (num - self._num_means) / self._num_scales
+            X = np.zeros((len(num), self._n_features_out), dtype=np.float32)
+            X[:, :num.shape[1]] = num
+            for j, lookup in enumerate(self._cat_lookups):
+                for i in range(len(num)):
+                    value = cat_array[i, j]
+                    if isinstance(value, float) and value != value:
+                        value = 'missing'
+                    idx = lookup.get(value)
+                    if idx is not None:
+                        X[i, idx] = 1.0
+        else:
+            # Fallback: run the fitted transformers on the pre-split arrays
+            num_t = self.preprocessor.named_transformers_['num'].transform(num_array)
+            cat_t = self.preprocessor.named_transformers_['cat'].transform(cat_array)
+            if hasattr(cat_t, 'toarray'):
+                cat_t = cat_t.toarray()
+            X = np.hstack([num_t, cat_t])
+
+        logits = X @ self._coefs_f32 + float(self.model.intercept_[0])
+        probs = 1.0 / (1.0 + np.exp(-logits))
+        impacts = X * self._coefs_f32
+
+        return [{
+            "score": round(float(prob) * 100),
+            "probability": round(float(prob), 4),
+            "explanation": self._top_factors(impacts[i])
+        } for i, prob in enumerate(probs)]
+
     def get_explanation(self, df_lead):
         """Extracts top features contributing to the score."""
-        # Get feature names after preprocessing
-        feature_names = self._get_feature_names()
-        
-        # Transform lead
         transformed_x = self.preprocessor.transform(df_lead)
-        if hasattr(transformed_x, 'toarray'):
-            transformed_x = transformed_x.toarray()
-            
-        # Get coefficients
-        coefs = self.model.coef_[0]
-        
+
+        if hasattr(transformed_x, 'multiply'):
+            # Sparse row: multiply in place and scan only the nonzeros,
+            # O(nnz) instead of O(n_features) for one-hot-heavy schemas
+            impacts_sp = transformed_x.multiply(self._coefs_f32).tocsr()
+            return self._top_factors(impacts_sp.data, impacts_sp.indices)
+
         # Calculate impact (value * weight)
-        impacts = transformed_x[0] * coefs
-        
-        # Map to original features (simplified for baseline)
-        impact_series = pd.Series(impacts, index=feature_names)
-        
-        top_positive = impact_series.sort_values(ascending=False).head(3).index.tolist()
-        top_negative = impact_series.sort_values(ascending=True).head(3).index.tolist()
-        
+        return self._top_factors(transformed_x[0] * self._coefs_f32)
+
+    def _top_factors(self, impacts: np.ndarray, indices: np.ndarray = None):
+        """Top-3 positive/negative impact features for one impact vector.
+
+        indices marks impacts as the nonzero entries of a sparse row; the
+        row is scattered back to the full feature space first so
+        zero-impact features stay ranking candidates, keeping sparse and
+        dense rows with identical impacts identically explained.
+        """
+        if indices is not None:
+            full = np.zeros(len(self._feature_names), dtype=np.float32)
+            full[indices] = impacts
+            impacts = full
+
+        # O(n) top-3 via argpartition instead of two full sorts on a Series
+        k = min(3, len(impacts))
+        idx_pos = np.argpartition(impacts, -k)[-k:]
+        idx_pos = idx_pos[np.argsort(-impacts[idx_pos])]
+        idx_neg = np.argpartition(impacts, k - 1)[:k]
+        idx_neg = idx_neg[np.argsort(impacts[idx_neg])]
+
         return {
-            "top_positive_factors": top_positive,
-            "top_negative_factors": top_negative
+            "top_positive_factors": [self._feature_names[i] for i in idx_pos],
+            "top_negative_factors": [self._feature_names[i] for i in idx_neg]
         }
 
     def _get_feature_names(self):
@@ -46,6 +46,30 @@ CREATE INDEX IF NOT EXISTS idx_leads_raw_data ON leadscoring.leads USING gin (ra
 CREATE INDEX IF NOT EXISTS idx_lead_scores_lead_id ON leadscoring.lead_scores(lead_id);
 CREATE INDEX IF NOT EXISTS idx_lead_scores_created_at ON leadscoring.lead_scores(created_at DESC);
 
--- Note: To access this from the Supabase client (PostgREST), 
+-- 5. Server-side filter for leads that have no score yet.
+-- Filtering here means only unscored rows cross the wire, instead of
+-- every lead plus an embedded join filtered client-side.
+CREATE OR REPLACE FUNCTION leadscoring.get_unscored_leads()
+RETURNS SETOF leadscoring.leads
+LANGUAGE sql STABLE AS $$
+    SELECT l.*
+    FROM leadscoring.leads l
+    LEFT JOIN leadscoring.lead_scores s ON s.lead_id = l.id
+    WHERE s.id IS NULL;
+$$;
+
+-- 6. Server-side score histogram: ships O(bins) rows to the dashboard
+-- instead of every score value. LEAST folds width_bucket's overflow
+-- bucket (score = 100 would land in bins + 1) into the last bin.
+CREATE OR REPLACE FUNCTION leadscoring.lead_score_hist(bins int DEFAULT 20)
+RETURNS TABLE(bucket int, count bigint)
+LANGUAGE sql STABLE AS $$
+    SELECT LEAST(width_bucket(score, 0, 100, bins), bins) AS bucket, count(*) AS count
+    FROM leadscoring.lead_scores
+    GROUP BY 1
+    ORDER BY 1;
+$$;
+
+-- Note: To access this from the Supabase client (PostgREST),
 -- you must add 'leadscoring' to the 'db_schemas' setting in the Supabase Dashboard
 -- or use the schema prefix if configured to expose multiple schemas.
@@ -1,37 +1,119 @@
 import streamlit as st
+import numpy as np
 import pandas as pd
-import plotly.express as px
 from db_supabase import SupabaseDB
 from predict import LeadScorer
 from orchestrator import LeadOrchestrator
 import joblib
+import json
 import os
 import io
+from concurrent.futures import ThreadPoolExecutor
 
 # Page Config
 st.set_page_config(page_title="Lead Scoring AI - Automatización", layout="wide")
 
 # Initialize Components
-@st.cache_resource
+@st.cache_resource(max_entries=1, show_spinner=False)
 def load_components():
-    db = None
+    # No st.* calls in here: this may run on a worker thread, where
+    # widget calls have no script context. The error travels back instead.
+    db, db_error = None, None
     try:
-        db = SupabaseDB()
+        db = SupabaseDB.instance()
     except Exception as e:
-        st.sidebar.error(f"Error de conexión: {str(e)}")
-        st.warning("Supabase no conectado. Algunos paneles estarán vacíos.")
-    
-    scorer = LeadScorer()
+        db_error = str(e)
+
+    scorer = LeadScorer.from_path()
     orchestrator = LeadOrchestrator()
-    return db, scorer, orchestrator
+    return db, scorer, orchestrator, db_error
+
+# show_spinner=False: this runs on the startup executor's worker thread,
+# which has no script context to render a spinner from
+@st.cache_data(ttl=24 * 60 * 60, show_spinner=False)
+def load_metadata(path='model_metadata.json'):
+    """Model metadata, loaded once per process instead of on every rerun.
+
+    Prefers the JSON artifact (cheap parse, no joblib on the render path);
+    falls back to the legacy pickle from older training runs.
+    """
+    if os.path.exists(path):
+        with open(path) as f:
+            return json.load(f)
+    legacy = 'model_metadata.pkl'
+    return joblib.load(legacy) if os.path.exists(legacy) else None
+
+@st.cache_data(ttl=3600)
+def load_local_csv(path='marketing_data.csv', nrows=1000):
+    """Cached, memory-slim slice of the local dataset for offline previews.
+
+    Only nrows are parsed since just the head is shown, low-cardinality
+    strings become category and numerics are downcast.
+    """
+    if not os.path.exists(path):
+        return None
+    df = pd.read_csv(path, nrows=nrows)
+    # Headers-only file: nothing to downcast (and nunique/len would divide by 0)
+    if len(df) == 0:
+        return df
+    for col in df.select_dtypes('object').columns:
+        if df[col].nunique() / len(df) < 0.5:
+            df[col] = df[col].astype('category')
+    for col in df.select_dtypes('integer').columns:
+        df[col] = pd.to_numeric(df[col], downcast='integer')
+    for col in df.select_dtypes('float').columns:
+        df[col] = pd.to_numeric(df[col], downcast='float')
+    return df
+
+SCORES_PAGE_SIZE = 500
+
+@st.cache_data(ttl=30, show_spinner=False)
+def fetch_scores_page(_client, offset: int, limit: int = SCORES_PAGE_SIZE):
+    """One page of scoring history; cached so widget reruns skip the network.
+
+    The leading underscore tells Streamlit not to hash the client object.
+    """
+    # Only the columns the table actually renders — no over-select
+    response = _client.schema("leadscoring").table("lead_scores")\
+        .select("created_at,score,probability,explanation,leads(raw_data)")\
+        .order("created_at", desc=True)\
+        .range(offset, offset + limit - 1)\
+        .execute()
+    return response.data
+
+@st.cache_data(ttl=30, show_spinner=False)
+def fetch_score_histogram(_db, bins: int = 20):
+    """Server-side score histogram, cached between nearby reruns."""
+    return _db.get_score_histogram(bins=bins)
+
+@st.cache_data(ttl=60, show_spinner=False)
+def build_hist_fig(x_tuple: tuple, counts_tuple: tuple, title: str):
+    """Plotly figure for pre-binned counts, cached on the bin values.
 
-db, scorer, orchestrator = load_components()
+    Regenerating the figure spec costs more than the fetch once data is
+    cached; tuple args keep the cache key cheap and hashable.
+    """
+    import plotly.express as px
+    return px.bar(x=list(x_tuple), y=list(counts_tuple),
+                  labels={'x': 'Score', 'y': 'Leads'}, title=title)
+
+# Session-start I/O: the Supabase/model setup and the metadata read are
+# independent and both release the GIL, so first render waits for the
+# slower of the two rather than their sum. Later reruns hit the caches.
+with ThreadPoolExecutor(max_workers=2) as _startup:
+    _f_components = _startup.submit(load_components)
+    _f_meta = _startup.submit(load_metadata)
+    db, scorer, orchestrator, db_error = _f_components.result()
+    meta = _f_meta.result()
+
+if db_error:
+    st.warning("Supabase no conectado. Algunos paneles estarán vacíos.")
 
 # Database Connection Helper in Sidebar
 with st.sidebar:
     st.header("🔗 Conexión")
     if not db:
-        st.error("Supabase no conectado")
+        st.error(f"Error de conexión: {db_error}" if db_error else "Supabase no conectado")
         with st.expander("¿Cómo conectar?"):
             st.write("Añade estas variables en 'Secrets' de Streamlit Cloud o en tu `.env` local:")
             st.code("SUPABASE_URL=tu_url\nSUPABASE_KEY=tu_anon_key")
@@ -49,8 +131,7 @@ with st.sidebar:
     st.header("⚙️ Estado del Sistema")
     if scorer.pipeline:
         st.success("Modelo Activo: LogisticRegression")
-        if os.path.exists('model_metadata.pkl'):
-            meta = joblib.load('model_metadata.pkl')
+        if meta:
             st.metric("Precisión (AUC)", f"{meta['auc']:.4f}")
     
     st.divider()
@@ -64,77 +145,198 @@ with st.sidebar:
         except Exception as e:
             st.error(f"Error durante la sincronización: {e}")
 
+def scorer_cat_options(col_name):
+    """Known categories for a feature, taken from the fitted encoder."""
+    try:
+        onehot = scorer.preprocessor.named_transformers_['cat'].named_steps['onehot']
+        position = scorer.metadata['cat_cols'].index(col_name)
+        return [c for c in onehot.categories_[position] if c != 'missing']
+    except Exception:
+        return []
+
 # Main Tabs
-tab1, tab2 = st.tabs(["📊 Panel de Resultados", "📤 Procesamiento por Lote (CSV)"])
+tab1, tab2, tab3 = st.tabs([
+    "📊 Panel de Resultados",
+    "📤 Procesamiento por Lote (CSV)",
+    "🧮 Predictor Manual"
+])
 
 with tab1:
     st.header("Histórico de Scoring (Automático)")
     
     if db:
         try:
-            # Fetch scores using the isolated schema
-            response = db.client.schema("leadscoring").table("lead_scores").select("*, leads(raw_data)").execute()
-            data = response.data
+            # Only the visible page is fetched and materialized
+            if 'score_page' not in st.session_state:
+                st.session_state.score_page = 0
+            page_size = st.selectbox("Resultados por página", [100, 250, SCORES_PAGE_SIZE], index=2)
+            data = fetch_scores_page(db.client, st.session_state.score_page * page_size, page_size)
             if data:
-                # Process data for display
-                display_data = []
-                for item in data:
-                    raw = item.get('leads', {}).get('raw_data', {})
-                    display_data.append({
-                        "Fecha": item['created_at'],
-                        "Canal": raw.get('channel', 'N/A'),
-                        "Campaña": raw.get('campaign', 'N/A'),
-                        "Score": item['score'],
-                        "Probabilidad": f"{item['probability']*100:.1f}%",
-                        "Factores Positivos": ", ".join(item['explanation'].get('top_positive_factors', []))
-                    })
-                
-                df_scores = pd.DataFrame(display_data)
+                # Imported lazily: predictor-only sessions never pay the
+                # ~300 ms plotly import on cold start
+                import plotly.express as px
+
+                # Flatten in C with json_normalize, then derive the display
+                # columns vectorized instead of one Python loop per row
+                df_raw = pd.json_normalize(data, sep='.')
+
+                def raw_col(name):
+                    if name in df_raw.columns:
+                        return df_raw[name]
+                    return pd.Series(None, index=df_raw.index, dtype=object)
+
+                # category/float32 dtypes roughly halve the Arrow payload
+                # Streamlit serializes to the browser
+                df_scores = pd.DataFrame({
+                    "Fecha": df_raw['created_at'],
+                    "Canal": raw_col('leads.raw_data.channel').fillna('N/A').astype('category'),
+                    "Campaña": raw_col('leads.raw_data.campaign').fillna('N/A').astype('category'),
+                    "Score": df_raw['score'].astype(np.float32),
+                    "Probabilidad": (df_raw['probability'] * 100).round(1).astype(str) + '%',
+                    "Factores Positivos": raw_col('explanation.top_positive_factors').str.join(', ').fillna('')
+                })
                 
                 # Metrics
                 c1, c2, c3 = st.columns(3)
-                c1.metric("Total Leads", len(df_scores))
+                c1.metric("Leads (página)", len(df_scores))
                 c2.metric("Media Score", round(df_scores['Score'].mean(), 1))
                 c3.metric("Leads Hot (>70)", len(df_scores[df_scores['Score'] > 70]))
 
-                st.dataframe(df_scores.sort_values("Fecha", ascending=False), use_container_width=True)
-                
+                # Cap the rows shipped to the grid; deeper history is reached
+                # through the page buttons below, not by sending more rows
+                st.dataframe(df_scores.sort_values("Fecha", ascending=False).head(SCORES_PAGE_SIZE),
+                             use_container_width=True, hide_index=True)
+
+                col_prev, col_page, col_next = st.columns([1, 1, 1])
+                if col_prev.button("⬅️ Anterior", disabled=st.session_state.score_page == 0):
+                    st.session_state.score_page -= 1
+                    st.rerun()
+                col_page.caption(f"Página {st.session_state.score_page + 1}")
+                # A short page means there is nothing beyond it
+                if col_next.button("Siguiente ➡️", disabled=len(data) < page_size):
+                    st.session_state.score_page += 1
+                    st.rerun()
+
                 # Visuals
                 fig = px.box(df_scores, x="Canal", y="Score", color="Canal", title="Calidad de Leads por Canal")
                 st.plotly_chart(fig, use_container_width=True)
+
+                # Score distribution, aggregated server-side so only
+                # O(bins) rows travel instead of every score
+                try:
+                    hist_bins = 20
+                    hist = fetch_score_histogram(db, bins=hist_bins)
+                    if hist:
+                        centers = tuple((row['bucket'] - 0.5) * (100 / hist_bins) for row in hist)
+                        counts = tuple(row['count'] for row in hist)
+                        fig_hist = build_hist_fig(centers, counts, "Distribución de Scores")
+                        st.plotly_chart(fig_hist, use_container_width=True)
+                except Exception:
+                    # Fallback: bin the current page with numpy so the browser
+                    # still receives O(bins) points rather than raw scores
+                    counts, edges = np.histogram(df_raw['score'].to_numpy(), bins=20, range=(0, 100))
+                    fig_hist = build_hist_fig(tuple(((edges[:-1] + edges[1:]) / 2).tolist()),
+                                              tuple(counts.tolist()),
+                                              "Distribución de Scores (página actual)")
+                    st.plotly_chart(fig_hist, use_container_width=True)
+            elif st.session_state.score_page > 0:
+                # Off the end (row count was an exact multiple of the page
+                # size): step back so the pager doesn't strand the session
+                st.session_state.score_page -= 1
+                st.rerun()
             else:
                 st.info("No hay leads procesados. Sube un archivo o pulsa 'Sincronizar Pendientes'.")
         except Exception as e:
             st.error(f"Error al cargar datos: {e}")
     else:
         st.error("Conexión a base de datos necesaria para el panel histórico.")
+        df_local = load_local_csv()
+        if df_local is not None:
+            st.info("Vista previa del dataset local (marketing_data.csv):")
+            st.dataframe(df_local.head(10), use_container_width=True)
 
 with tab2:
     st.header("Subir archivo de Leads")
-    st.write("Sube un CSV para que el sistema limpie, normalice y prediga automáticamente cada lead.")
-    
-    uploaded_file = st.file_uploader("Elige un archivo CSV", type="csv")
-    
+    st.write("Sube un CSV o Parquet para que el sistema limpie, normalice y prediga automáticamente cada lead.")
+
+    uploaded_file = st.file_uploader("Elige un archivo CSV o Parquet", type=["csv", "parquet"])
+
     if uploaded_file is not None:
-        df_upload = pd.read_csv(uploaded_file)
+        is_parquet = uploaded_file.name.endswith('.parquet')
+        df_upload = pd.read_parquet(uploaded_file) if is_parquet else pd.read_csv(uploaded_file)
         st.write("Vista previa del archivo:")
         st.dataframe(df_upload.head())
-        
+
         if st.button("🚀 Iniciar Procesamiento Automático"):
             try:
                 with st.spinner("Limpiando, normalizando y prediciendo..."):
-                    # Use orchestrator to process
-                    temp_path = "temp_batch.csv"
-                    df_upload.to_csv(temp_path, index=False)
-                    results = orchestrator.process_batch(temp_path)
-                    
+                    # The upload is already parsed; process it in memory
+                    results = orchestrator.process_dataframe(df_upload)
+
                     st.success(f"¡Éxito! Se han procesado {len(results)} leads automáticamente.")
                     # Show summary
                     scores = [r['score'] for r in results if r]
                     if scores:
                         st.write(f"Score promedio del lote: **{sum(scores)/len(scores):.1f}**")
-                    
-                    if os.path.exists(temp_path): os.remove(temp_path)
+
                     st.rerun()
             except Exception as e:
                 st.error(f"Error durante el procesamiento: {e}")
+
+with tab3:
+    st.header("Predictor Manual")
+    st.write("Introduce los datos de un lead para calcular su score, o acumula varios y puntúalos en un solo lote.")
+
+    if not scorer.pipeline:
+        st.error("Modelo no disponible. Entrena primero con train.py.")
+    else:
+        if 'pending_leads' not in st.session_state:
+            st.session_state.pending_leads = []
+
+        # The form batches every widget edit into one rerun on submit,
+        # instead of re-running the whole script per keystroke/click
+        with st.form("lead_form"):
+            lead_input = {}
+            input_cols = st.columns(2)
+            for i, col_name in enumerate(scorer.metadata['cat_cols']):
+                options = scorer_cat_options(col_name)
+                if options:
+                    lead_input[col_name] = input_cols[i % 2].selectbox(col_name, options)
+                else:
+                    lead_input[col_name] = input_cols[i % 2].text_input(col_name)
+            offset = len(scorer.metadata['cat_cols'])
+            for i, col_name in enumerate(scorer.metadata['num_cols']):
+                lead_input[col_name] = input_cols[(offset + i) % 2].number_input(col_name, min_value=0.0, value=0.0)
+
+            c_score, c_add = st.columns(2)
+            submitted = c_score.form_submit_button("Calcular Score")
+            add_to_batch = c_add.form_submit_button("Añadir al lote")
+
+        if submitted:
+            result = scorer.predict(lead_input)
+            if result:
+                r1, r2 = st.columns(2)
+                r1.metric("Score", result['score'])
+                r2.metric("Probabilidad", f"{result['probability']*100:.1f}%")
+                st.subheader("Factores")
+                # One markdown frame instead of one st.write per factor
+                st.markdown("\n".join(
+                    [f"- ✅ {f.replace('_', ' ').title()}" for f in result['explanation']['top_positive_factors']] +
+                    [f"- ⚠️ {f.replace('_', ' ').title()}" for f in result['explanation']['top_negative_factors']]
+                ))
+
+        if add_to_batch:
+            st.session_state.pending_leads.append(dict(lead_input))
+
+        n_pending = len(st.session_state.pending_leads)
+        if st.button(f"Puntuar lote ({n_pending})", disabled=n_pending == 0):
+            # One vectorized predict_batch call over the whole pending batch
+            # instead of one pipeline invocation per lead
+            batch_results = scorer.predict_batch(pd.DataFrame(st.session_state.pending_leads))
+            df_batch = pd.DataFrame({
+                "Score": [r['score'] for r in batch_results],
+                "Probabilidad": [f"{r['probability']*100:.1f}%" for r in batch_results],
+                "Factores Positivos": [", ".join(r['explanation']['top_positive_factors']) for r in batch_results]
+            })
+            st.dataframe(df_batch, use_container_width=True)
+            st.session_state.pending_leads = []